@@ -1,28 +1,26 @@
+import asyncio
 import pytest
+from collections import OrderedDict
 from unittest.mock import MagicMock, AsyncMock, patch
 from wallet.flash_provider import FlashProvider
 
 @pytest.fixture
-def mock_tron_client(mocker):
-    mock_client = AsyncMock()
-    mocker.patch('wallet.tron_provider.AsyncTron', return_value=mock_client)
-    return mock_client
+def mock_tron_client():
+    return MagicMock()
 
 @pytest.fixture
 def provider(mock_tron_client):
-    with pytest.MonkeyPatch.context() as m:
-        m.setattr("wallet.tron_provider.AsyncHTTPProvider", MagicMock())
-        # FlashProvider extends TronProvider
-        p = FlashProvider(
-            rpc_url="http://mock",
-            privy_app_id="mock_id",
-            privy_app_secret="mock_secret",
-            wallet_id="T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb"
-        )
-        p.client = mock_tron_client
-        p.flash_client = mock_tron_client # Use same mock for simplicity
-        p.address = "T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb"
-        return p
+    # FlashProvider extends TronProvider
+    p = FlashProvider(
+        rpc_url="http://mock",
+        privy_app_id="mock_id",
+        privy_app_secret="mock_secret",
+        wallet_id="T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb"
+    )
+    p.client = mock_tron_client
+    p.flash_client = mock_tron_client # Use same mock for simplicity
+    p.address = "T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb"
+    return p
 
 @pytest.mark.asyncio
 async def test_sign_transaction_privy(provider):
@@ -34,7 +32,7 @@ async def test_sign_transaction_privy(provider):
     
     with patch("httpx.AsyncClient") as mock_client_cls:
         mock_client = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_client
+        mock_client_cls.return_value = mock_client
         
         mock_resp = MagicMock()
         mock_resp.json.return_value = {"signature": "somesig"}
@@ -69,8 +67,6 @@ async def test_send_transaction_privy(provider, mock_tron_client):
     mock_builder.fee_limit.return_value = mock_builder
     mock_builder.build = AsyncMock(return_value=mock_txn)
     
-    # Override client.trx with MagicMock to avoid AsyncMock issues
-    provider.client.trx = MagicMock()
     provider.client.trx.transfer.return_value = mock_builder
     
     # Mock broadcast on signed txn
@@ -78,7 +74,7 @@ async def test_send_transaction_privy(provider, mock_tron_client):
     
     with patch("httpx.AsyncClient") as mock_client_cls:
         mock_client = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_client
+        mock_client_cls.return_value = mock_client
         mock_resp = MagicMock()
         mock_resp.json.return_value = {"signature": "somesig"}
         mock_client.post.return_value = mock_resp
@@ -88,3 +84,60 @@ async def test_send_transaction_privy(provider, mock_tron_client):
         assert result["result"] is True
         assert mock_txn._signature == ["somesig"]
         mock_txn.broadcast.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_sign_transaction_reuses_http_client(provider):
+    mock_txn = MagicMock()
+    mock_txn.txid = "deadbeef"
+
+    with patch("httpx.AsyncClient") as mock_client_cls:
+        mock_client = AsyncMock()
+        mock_client_cls.return_value = mock_client
+        mock_resp = MagicMock()
+        mock_resp.json.return_value = {"signature": "somesig"}
+        mock_client.post.return_value = mock_resp
+
+        await provider.sign_transaction(mock_txn)
+        await provider.sign_transaction(mock_txn)
+
+        mock_client_cls.assert_called_once()
+        assert mock_client.post.call_count == 2
+
+        await provider.aclose()
+        mock_client.aclose.assert_awaited_once()
+        assert provider._http is None
+
+def test_http_client_is_per_event_loop(monkeypatch):
+    monkeypatch.setattr("wallet.tron_provider._INSTANCE_CACHE", OrderedDict())
+    mock_txn = MagicMock()
+    mock_txn.txid = "deadbeef"
+    kwargs = dict(rpc_url="http://mock", privy_app_id="mock_id", privy_app_secret="mock_secret", wallet_id="wallet")
+
+    def make_client(**client_kwargs):
+        client = AsyncMock()
+        client.post.return_value = MagicMock()
+        return client
+
+    async def session():
+        p = await FlashProvider.get_or_create(**kwargs)
+        await p.sign_transaction(mock_txn)
+        return p, p._http
+
+    with patch("httpx.AsyncClient", side_effect=make_client) as mock_client_cls:
+        first, first_http = asyncio.run(session())
+        second, second_http = asyncio.run(session())
+
+    assert first is second
+    # The client from the first, now closed, loop is not reused
+    assert second_http is not first_http
+    assert mock_client_cls.call_count == 2
+
+def test_missing_credentials_logs_warning(caplog):
+    with pytest.MonkeyPatch.context() as m:
+        m.delenv("PRIVY_APP_SECRET", raising=False)
+        m.delenv("PRIVY_WALLET_ID", raising=False)
+        with caplog.at_level("WARNING", logger="wallet.flash_provider"):
+            FlashProvider(rpc_url="http://mock", privy_app_id="mock_id")
+
+    assert "Privy credentials not fully provided" in caplog.text
+    assert "app_id=True app_secret=False wallet_id=False" in caplog.text
@@ -1,46 +1,160 @@
+import asyncio
+import threading
+import weakref
 import pytest
+from collections import OrderedDict
+from decimal import Decimal
 from unittest.mock import MagicMock, AsyncMock
 from tronpy import AsyncTron
 from wallet.tron_provider import TronProvider
 
-@pytest.fixture
-def mock_tron_client(mocker):
-    mock_client = AsyncMock(spec=AsyncTron)
-    mocker.patch('wallet.tron_provider.AsyncTron', return_value=mock_client)
-    # Also patch the provider inside TronProvider init or just mock the client attribute
-    return mock_client
+# Building the spec'd client mock and the provider dominates setup time,
+# so both are created once per module and the mock is reset between tests.
+# A plain MagicMock is used; tests attach AsyncMock only to the methods they await.
+@pytest.fixture(scope="module")
+def mock_tron_client():
+    return MagicMock(spec=AsyncTron)
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def provider(mock_tron_client):
-    # Mock AsyncHTTPProvider to avoid network calls during init
     with pytest.MonkeyPatch.context() as m:
-        m.setattr("wallet.tron_provider.AsyncHTTPProvider", MagicMock())
         # Mock PrivateKey to avoid errors with dummy key
         m.setattr("wallet.tron_provider.PrivateKey", MagicMock())
         p = TronProvider(private_key="00" * 32)
-        # Manually set the client to our mock because __init__ creates a new instance
+        # Pin the client to our mock instead of the shared client for the running loop
         p.client = mock_tron_client
         p._key = MagicMock()
         p.address = "T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb"
         return p
 
+@pytest.fixture(autouse=True)
+def reset_shared_state(mock_tron_client, provider):
+    provider._balance_cache.clear()
+    # Also clear configured return values/side effects so one test's setup
+    # cannot leak into the next through the shared mock.
+    mock_tron_client.reset_mock(return_value=True, side_effect=True)
+
+@pytest.fixture
+def tron_clients(monkeypatch):
+    # Empty shared client cache whose clients are independent mocks
+    monkeypatch.setattr("wallet.tron_provider._CLIENT_CACHE", weakref.WeakKeyDictionary())
+    monkeypatch.setattr("wallet.tron_provider.AsyncHTTPProvider", MagicMock())
+    tron_cls = MagicMock(side_effect=lambda provider: AsyncMock())
+    monkeypatch.setattr("wallet.tron_provider.AsyncTron", tron_cls)
+    return tron_cls
+
 @pytest.mark.asyncio
 async def test_get_balance(provider, mock_tron_client):
-    mock_tron_client.get_account_balance.return_value = 100.5
+    mock_tron_client.get_account = AsyncMock(return_value={"balance": 100_000_001})
     balance = await provider.get_balance()
-    assert balance == 100.5
-    mock_tron_client.get_account_balance.assert_called_with("T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb")
+    assert balance == 100_000_001
+    mock_tron_client.get_account.assert_called_with("T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb")
+
+@pytest.mark.asyncio
+async def test_get_balance_trx(provider, mock_tron_client):
+    mock_tron_client.get_account = AsyncMock(return_value={"balance": 100_000_001})
+    assert await provider.get_balance_trx() == Decimal("100.000001")
+
+@pytest.mark.asyncio
+async def test_get_balance_without_balance_field(provider, mock_tron_client):
+    # Activated accounts holding 0 TRX omit the field
+    mock_tron_client.get_account = AsyncMock(return_value={"address": provider.address})
+    assert await provider.get_balance() == 0
+
+@pytest.mark.asyncio
+async def test_get_balance_ttl_cache(provider, mock_tron_client, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("wallet.tron_provider.time.monotonic", lambda: clock[0])
+    monkeypatch.setattr(provider, "_balance_ttl", 1.0)
+    mock_tron_client.get_account = AsyncMock(side_effect=[{"balance": 1}, {"balance": 2}])
+
+    assert await provider.get_balance() == 1
+    clock[0] += provider._balance_ttl / 2
+    assert await provider.get_balance() == 1
+    clock[0] += provider._balance_ttl
+    assert await provider.get_balance() == 2
+    assert mock_tron_client.get_account.call_count == 2
+
+@pytest.mark.asyncio
+async def test_get_balance_cache_is_bounded(provider, mock_tron_client, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("wallet.tron_provider.time.monotonic", lambda: clock[0])
+    monkeypatch.setattr("wallet.tron_provider._BALANCE_CACHE_SIZE", 2)
+    monkeypatch.setattr(provider, "_balance_ttl", 1.0)
+    mock_tron_client.get_account = AsyncMock(return_value={"balance": 1})
+
+    for addr in ("a", "b", "c"):
+        await provider.get_balance(addr)
+    assert list(provider._balance_cache) == ["b", "c"]
+    # Expired entries are dropped rather than left in place
+    clock[0] += 2
+    await provider.get_balance("d")
+    assert list(provider._balance_cache) == ["d"]
+
+@pytest.mark.asyncio
+async def test_get_balance_uncached_by_default(provider, mock_tron_client):
+    mock_tron_client.get_account = AsyncMock(side_effect=[{"balance": 1}, {"balance": 2}])
+    assert await provider.get_balance() == 1
+    assert await provider.get_balance() == 2
+    assert not provider._balance_cache
 
 @pytest.mark.asyncio
 async def test_get_trc20_balance(provider, mock_tron_client):
-    mock_contract = AsyncMock()
-    mock_contract.functions.balanceOf.return_value = 1000
-    mock_tron_client.get_contract.return_value = mock_contract
-    
-    balance = await provider.get_trc20_balance("wallet_addr", "contract_addr")
+    mock_tron_client.trigger_const_smart_contract_function = AsyncMock(return_value=f"{1000:064x}")
+
+    wallet = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+    balance = await provider.get_trc20_balance(wallet, "contract_addr")
     assert balance == 1000
-    mock_tron_client.get_contract.assert_called_with("contract_addr")
-    mock_contract.functions.balanceOf.assert_called_with("wallet_addr")
+    # balanceOf is encoded locally; no ABI fetch
+    mock_tron_client.get_contract.assert_not_called()
+    mock_tron_client.trigger_const_smart_contract_function.assert_called_once_with(
+        "410000000000000000000000000000000000000000", "contract_addr", "balanceOf(address)", "0" * 24 + "a614f803b6fd780986a42c78ec9c7f77e6ded13c"
+    )
+
+@pytest.mark.asyncio
+async def test_get_trc20_balance_not_a_contract(provider, mock_tron_client):
+    mock_tron_client.trigger_const_smart_contract_function = AsyncMock(return_value="")
+    with pytest.raises(ValueError, match="not_a_contract"):
+        await provider.get_trc20_balance(provider.address, "not_a_contract")
+
+@pytest.mark.asyncio
+async def test_get_trc20_balances(provider, mock_tron_client):
+    in_flight = 0
+    peak = 0
+
+    async def balance_of(owner, contract_address, selector, parameter):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return f"{int(contract_address[-1]):064x}"
+    mock_tron_client.trigger_const_smart_contract_function = AsyncMock(side_effect=balance_of)
+
+    contracts = [f"token{i}" for i in range(5)]
+    balances = await provider.get_trc20_balances(provider.address, contracts, max_concurrency=2)
+    assert balances == [0, 1, 2, 3, 4]
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_max_concurrency_must_be_positive(provider, mock_tron_client):
+    with pytest.raises(ValueError):
+        await provider.get_trc20_balances(provider.address, ["token"], max_concurrency=0)
+    with pytest.raises(ValueError):
+        await provider.send_transactions([("a", 1)], max_concurrency=0)
+    mock_tron_client.trigger_const_smart_contract_function.assert_not_called()
+    mock_tron_client.trx.transfer.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_balances(provider, mock_tron_client):
+    mock_tron_client.get_account = AsyncMock(return_value={"balance": 100_500_000})
+    token_balances = {"usdt": 1000, "usdc": 2000}
+    mock_tron_client.trigger_const_smart_contract_function = AsyncMock(
+        side_effect=lambda owner, contract_address, selector, parameter: f"{token_balances[contract_address]:064x}"
+    )
+
+    balances = await provider.get_balances(contract_addresses=["usdt", "usdc"])
+    assert balances == {"trx": 100_500_000, "usdt": 1000, "usdc": 2000}
 
 @pytest.mark.asyncio
 async def test_send_transaction(provider, mock_tron_client):
@@ -63,9 +177,185 @@ async def test_send_transaction(provider, mock_tron_client):
     
     mock_txn.sign.return_value = mock_signed_txn
 
-    result = await provider.send_transaction("recipient_addr", 50.0)
+    provider._balance_cache[provider.address] = (1, float("inf"))
+    result = await provider.send_transaction("recipient_addr", 50_000_000)
     
     assert result['result'] is True
     assert result['txid'] == '123'
     # Verify chain calls
-    mock_tron_client.trx.transfer.assert_called_with(provider.address, "recipient_addr", 50.0)
+    mock_tron_client.trx.transfer.assert_called_with(provider.address, "recipient_addr", 50_000_000)
+    mock_txn.sign.assert_called_once_with(provider._key)
+    # Sender balance is no longer served from cache
+    assert provider.address not in provider._balance_cache
+
+@pytest.mark.asyncio
+async def test_send_transactions(provider, mock_tron_client):
+    def transfer(from_, to, amount):
+        signed = MagicMock()
+        signed.broadcast = AsyncMock(return_value={"result": True, "to": to})
+        txn = MagicMock()
+        txn.sign.return_value = signed
+        builder = MagicMock()
+        builder.memo.return_value = builder
+        builder.fee_limit.return_value = builder
+        builder.build = AsyncMock(return_value=txn)
+        return builder
+    mock_tron_client.trx.transfer.side_effect = transfer
+
+    results = await provider.send_transactions([("a", 1), ("b", 2), ("c", 3)], max_concurrency=2)
+    assert [r["to"] for r in results] == ["a", "b", "c"]
+    assert mock_tron_client.trx.transfer.call_count == 3
+
+@pytest.mark.asyncio
+async def test_send_transactions_mid_batch_failure(provider, mock_tron_client):
+    broadcasts = []
+
+    def transfer(from_, to, amount):
+        async def broadcast():
+            if to == "bad":
+                raise ValueError("rejected")
+            broadcasts.append(to)
+            return {"result": True, "to": to}
+        signed = MagicMock()
+        signed.broadcast = broadcast
+        txn = MagicMock()
+        txn.sign.return_value = signed
+        builder = MagicMock()
+        builder.memo.return_value = builder
+        builder.fee_limit.return_value = builder
+        builder.build = AsyncMock(return_value=txn)
+        return builder
+    mock_tron_client.trx.transfer.side_effect = transfer
+
+    results = await provider.send_transactions([("a", 1), ("bad", 2), ("c", 3)])
+    assert results[0] == {"result": True, "to": "a"}
+    assert isinstance(results[1], ValueError)
+    assert results[2] == {"result": True, "to": "c"}
+    # Nothing is still broadcasting after the call returns
+    assert sorted(broadcasts) == ["a", "c"]
+
+@pytest.mark.asyncio
+async def test_providers_share_client(tron_clients):
+    a = TronProvider(rpc_url="http://node-a")
+    b = TronProvider(rpc_url="http://node-a")
+    c = TronProvider(rpc_url="http://node-b")
+    # Clients are only created on first access
+    tron_clients.assert_not_called()
+    assert a.client is b.client
+    assert a.client is not c.client
+    client_a, client_c = a.client, c.client
+
+    await TronProvider.close_clients()
+    client_a.close.assert_awaited_once()
+    client_c.close.assert_awaited_once()
+    assert a.client is not client_a
+
+def test_clients_are_per_event_loop(tron_clients):
+    p = TronProvider(rpc_url="http://node")
+
+    async def client():
+        return p.client
+
+    first = asyncio.run(client())
+    second = asyncio.run(client())
+    assert first is not second
+
+def test_client_outside_event_loop(tron_clients):
+    p = TronProvider(rpc_url="http://node")
+    client = p.client
+    assert p.client is client
+    tron_clients.assert_called_once()
+
+def test_env_defaults_read_at_construction(monkeypatch):
+    # Picked up without re-importing, e.g. after a late load_dotenv()
+    monkeypatch.setenv("TRON_RPC_URL", "http://from-env")
+    monkeypatch.delenv("TRON_PRIVATE_KEY", raising=False)
+    assert TronProvider().rpc_url == "http://from-env"
+    assert TronProvider(rpc_url="http://explicit").rpc_url == "http://explicit"
+
+@pytest.mark.asyncio
+async def test_create_derives_key_off_loop():
+    p = await TronProvider.create(rpc_url="http://mock", private_key="01" * 32)
+    assert isinstance(p, TronProvider)
+    assert p.address == TronProvider(rpc_url="http://mock", private_key="01" * 32).address
+    assert p.address.startswith("T")
+
+@pytest.mark.asyncio
+async def test_get_or_create_reuses_instance(monkeypatch):
+    monkeypatch.setattr("wallet.tron_provider._INSTANCE_CACHE", OrderedDict())
+    a = await TronProvider.get_or_create(rpc_url="http://mock", private_key="03" * 32)
+    b = await TronProvider.get_or_create(private_key="03" * 32, rpc_url="http://mock")
+    c = await TronProvider.get_or_create(rpc_url="http://other", private_key="03" * 32)
+    assert a is b
+    assert a is not c
+
+    TronProvider.clear_instances()
+    assert await TronProvider.get_or_create(rpc_url="http://mock", private_key="03" * 32) is not a
+
+@pytest.mark.asyncio
+async def test_get_or_create_evicts_least_recently_used(monkeypatch):
+    cache = OrderedDict()
+    monkeypatch.setattr("wallet.tron_provider._INSTANCE_CACHE", cache)
+    monkeypatch.setattr("wallet.tron_provider._INSTANCE_CACHE_SIZE", 2)
+    a = await TronProvider.get_or_create(rpc_url="http://a", private_key="03" * 32)
+    await TronProvider.get_or_create(rpc_url="http://b")
+    assert await TronProvider.get_or_create(rpc_url="http://a", private_key="03" * 32) is a
+    await TronProvider.get_or_create(rpc_url="http://c")
+
+    assert [dict(key[1])["rpc_url"] for key in cache] == ["http://a", "http://c"]
+    # Secrets are only kept in the key as a digest
+    assert "03" * 32 not in repr(list(cache))
+
+@pytest.mark.asyncio
+async def test_get_or_create_builds_once_under_concurrency(monkeypatch):
+    monkeypatch.setattr("wallet.tron_provider._INSTANCE_CACHE", OrderedDict())
+    create = MagicMock(side_effect=lambda **kwargs: asyncio.sleep(0, result=object()))
+    monkeypatch.setattr(TronProvider, "create", create)
+
+    results = await asyncio.gather(*(TronProvider.get_or_create(rpc_url="http://mock") for _ in range(3)))
+    assert results[0] is results[1] is results[2]
+    create.assert_called_once_with(rpc_url="http://mock")
+
+def test_get_or_create_after_close_clients(monkeypatch, tron_clients):
+    monkeypatch.setattr("wallet.tron_provider._INSTANCE_CACHE", OrderedDict())
+
+    async def session():
+        p = await TronProvider.get_or_create(rpc_url="http://mock")
+        client = p.client
+        await TronProvider.close_clients()
+        return p, client
+
+    first, first_client = asyncio.run(session())
+    second, second_client = asyncio.run(session())
+    assert first is second
+    # The cached provider picks up a fresh client rather than the closed one
+    assert second_client is not first_client
+    first_client.close.assert_awaited_once()
+
+def test_invalid_private_key_logs_warning(caplog):
+    with caplog.at_level("WARNING", logger="wallet.tron_provider"):
+        malformed = TronProvider(rpc_url="http://mock", private_key="not-hex")
+        out_of_range = TronProvider(rpc_url="http://mock", private_key="00" * 32)
+
+    assert malformed._key is None and malformed.address is None
+    assert out_of_range._key is None and out_of_range.address is None
+    assert "expected 64 hex characters" in caplog.records[0].getMessage()
+    assert caplog.records[0].exc_info is None
+    assert caplog.records[1].exc_info is not None
+
+@pytest.mark.asyncio
+async def test_sign_transactions(provider):
+    txns = [MagicMock() for _ in range(3)]
+    for i, txn in enumerate(txns):
+        txn.sign.return_value = f"signed{i}"
+
+    assert await provider.sign_transactions(txns) == ["signed0", "signed1", "signed2"]
+    for txn in txns:
+        txn.sign.assert_called_once_with(provider._key)
+
+@pytest.mark.asyncio
+async def test_sign_transaction_runs_on_signing_thread(provider):
+    txn = MagicMock()
+    txn.sign.side_effect = lambda key: threading.current_thread().name
+
+    assert (await provider.sign_transaction(txn)).startswith("tron-sign")
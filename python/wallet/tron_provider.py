@@ -1,56 +1,261 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import lru_cache
 from os import getenv
-from typing import Optional, Any
-from tronpy import AsyncTron
+from typing import Optional, Any, Dict, List, Tuple, Union
+from tronpy import AsyncTron, keys
 from tronpy.keys import PrivateKey
 from tronpy.providers import AsyncHTTPProvider
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Pre-encoded so tronpy's builder skips the str -> bytes encode on every transfer
+_MEMO = b"Powered by Agent Wallet"
+_FEE_LIMIT = 100_000_000
+# Caller for constant (read-only) contract calls, as tronpy's Contract uses
+_ZERO_ADDRESS = "410000000000000000000000000000000000000000"
+
+# Upper bound on addresses held in a provider's balance cache
+_BALANCE_CACHE_SIZE = 1024
+
+# Persistent worker threads for CPU-bound secp256k1 signing. coincurve releases
+# the GIL while signing, so one thread per core lets batches sign in parallel.
+_SIGN_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="tron-sign")
+
+# One AsyncTron (and so one HTTP connection pool) per (rpc_url, api_key),
+# shared by every provider pointed at the same node. httpx pools are bound to
+# the event loop that first used them, so clients are kept per running loop.
+_CLIENT_CACHE: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], AsyncTron]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def _get_client(rpc_url: str, api_key: Optional[str]) -> AsyncTron:
+    loop = asyncio.get_running_loop()
+    clients = _CLIENT_CACHE.get(loop)
+    if clients is None:
+        # A client can keep its loop alive, so drop the clients of loops that have closed
+        for closed in [l for l in _CLIENT_CACHE if l.is_closed()]:
+            del _CLIENT_CACHE[closed]
+        clients = _CLIENT_CACHE[loop] = {}
+    key = (rpc_url, api_key)
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = _new_client(rpc_url, api_key)
+    return client
+
+def _new_client(rpc_url: str, api_key: Optional[str]) -> AsyncTron:
+    if api_key:
+        provider = AsyncHTTPProvider(rpc_url, api_key=api_key)
+    else:
+        provider = AsyncHTTPProvider(rpc_url)
+    return AsyncTron(provider=provider)
+
+# Providers handed out by TronProvider.get_or_create, keyed by class and arguments,
+# least recently used first. While the first construction is in flight the entry
+# is its future, so concurrent callers wait for it instead of each building their own.
+_INSTANCE_CACHE: "OrderedDict[Tuple[Any, ...], Union[TronProvider, asyncio.Future[TronProvider]]]" = OrderedDict()
+_INSTANCE_CACHE_SIZE = 64
+# Constructor arguments that are only kept in cache keys as a digest
+_SECRET_KWARGS = frozenset({"private_key", "api_key", "privy_app_secret"})
+
+def _instance_key(cls: type, kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    items = []
+    for name, value in sorted(kwargs.items()):
+        if name in _SECRET_KWARGS and isinstance(value, str):
+            value = hashlib.sha256(value.encode()).hexdigest()
+        items.append((name, value))
+    return (cls, tuple(items))
+
+_is_hex64 = re.compile(r"[0-9a-fA-F]{64}").fullmatch
+
+def _derive_key(private_key_hex: str) -> Tuple[PrivateKey, str]:
+    """
+    Decode a hex private key and derive its base58check address.
+    :param private_key_hex: Private key in hex format
+    :return: (PrivateKey, address)
+    """
+    key = PrivateKey(bytes.fromhex(private_key_hex))
+    return key, key.public_key.to_base58check_address()
+
+@lru_cache(maxsize=1024)
+def _balance_of_parameter(wallet_address: str) -> str:
+    """
+    ABI-encode the balanceOf(address) argument for a base58 or hex address.
+    Memoized so sweeps over many tokens decode the same wallet address once.
+    :param wallet_address: Address holding the tokens
+    :return: 32-byte hex parameter
+    """
+    # The 20-byte account id (hex address minus the 0x41 prefix), left-padded to 32 bytes
+    return "0" * 24 + keys.to_hex_address(wallet_address)[2:]
+
 class TronProvider:
-    def __init__(self, rpc_url: Optional[str] = None, private_key: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        rpc_url: Optional[str] = None,
+        private_key: Optional[str] = None,
+        api_key: Optional[str] = None,
+        balance_ttl: float = 0.0
+    ):
         """
         Initialize the TronProvider with RPC URL, Private Key, and API Key.
         :param rpc_url: URL of the TRON RPC node (default: from env or Trongrid)
         :param private_key: Private key in hex format (default: from env)
         :param api_key: TronGrid API Key (default: from env)
+        :param balance_ttl: Seconds a get_balance result is reused for the same address (default 0: disabled)
         """
         self.rpc_url = rpc_url or getenv("TRON_RPC_URL", "https://api.trongrid.io")
         self._private_key_hex = private_key or getenv("TRON_PRIVATE_KEY")
         self.api_key = api_key or getenv("TRON_GRID_API_KEY")
         
-        if self.api_key:
-            provider = AsyncHTTPProvider(self.rpc_url, api_key=self.api_key)
-        else:
-            provider = AsyncHTTPProvider(self.rpc_url)
-            
-        self.client = AsyncTron(provider=provider)
+        # Explicitly assigned client; otherwise the shared one for the running loop is used
+        self._client: Optional[AsyncTron] = None
+        # address -> (balance, monotonic expiry), in insertion (and so expiry) order
+        self._balance_ttl = balance_ttl
+        self._balance_cache: Dict[str, Tuple[int, float]] = {}
         
+        self._key = None
+        self.address = None
         if self._private_key_hex:
-            try:
-                self._key = PrivateKey(bytes.fromhex(self._private_key_hex))
-                self.address = self._key.public_key.to_base58check_address()
-            except Exception as e:
-                print(f"Warning: Invalid private key provided: {e}")
-                self._key = None
-                self.address = None
-        else:
-            self._key = None
-            self.address = None
-
-    async def get_balance(self, address: Optional[str] = None) -> float:
+            if not _is_hex64(self._private_key_hex):
+                # Malformed input is rejected up front rather than via a raised exception
+                logger.warning("Invalid private key provided: expected 64 hex characters")
+            else:
+                try:
+                    self._key, self.address = _derive_key(self._private_key_hex)
+                except Exception:
+                    # Well-formed hex can still be out of the secp256k1 range
+                    logger.warning("Invalid private key provided", exc_info=True)
+
+    @property
+    def client(self) -> AsyncTron:
+        """
+        Tron client for this provider's (rpc_url, api_key) on the running event loop.
+        Resolved on each access rather than stored, so one provider can be used
+        across several asyncio.run calls. Outside a running loop there is no loop to
+        share with, so the provider gets its own client, kept for later accesses.
+        """
+        if self._client is not None:
+            return self._client
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Sync caller: fall back to a client owned by this provider
+            self._client = _new_client(self.rpc_url, self.api_key)
+            return self._client
+        return _get_client(self.rpc_url, self.api_key)
+
+    @client.setter
+    def client(self, client: AsyncTron) -> None:
+        self._client = client
+
+    @classmethod
+    async def create(cls, *args: Any, **kwargs: Any) -> "TronProvider":
+        """
+        Construct a provider from async code without blocking the event loop.
+        Key decoding and address derivation run in a worker thread; arguments are
+        the same as the constructor's.
+        :return: Provider instance
+        """
+        return await asyncio.to_thread(cls, *args, **kwargs)
+
+    @classmethod
+    async def get_or_create(cls, **kwargs: Any) -> "TronProvider":
+        """
+        Return a provider for these arguments, constructing it (via create) only once.
+        Lets callers that build a provider per request reuse the decoded key; clients are
+        still resolved per event loop. Up to _INSTANCE_CACHE_SIZE providers are kept,
+        least recently used evicted first; see clear_instances() to drop them all.
+        :return: Shared provider instance
+        """
+        key = _instance_key(cls, kwargs)
+        entry = _INSTANCE_CACHE.get(key)
+        if entry is not None:
+            _INSTANCE_CACHE.move_to_end(key)
+            if not isinstance(entry, asyncio.Future):
+                return entry
+        if entry is None or entry.get_loop().is_closed():
+            # Nothing cached, or a construction abandoned when its loop shut down
+            entry = asyncio.ensure_future(cls.create(**kwargs))
+            _INSTANCE_CACHE[key] = entry
+            while len(_INSTANCE_CACHE) > _INSTANCE_CACHE_SIZE:
+                _INSTANCE_CACHE.popitem(last=False)
+        try:
+            # Shielded so one cancelled caller doesn't cancel the build for the others
+            instance = await asyncio.shield(entry)
+        except Exception:
+            if _INSTANCE_CACHE.get(key) is entry:
+                del _INSTANCE_CACHE[key]
+            raise
+        if _INSTANCE_CACHE.get(key) is entry:
+            _INSTANCE_CACHE[key] = instance
+        return instance
+
+    @classmethod
+    def clear_instances(cls) -> None:
+        """
+        Forget every provider cached by get_or_create.
+        Providers already handed out keep working; later calls construct new ones.
+        """
+        _INSTANCE_CACHE.clear()
+
+    @classmethod
+    async def close_clients(cls) -> None:
+        """
+        Close the shared Tron clients of the running event loop and forget them.
+        Call before that loop shuts down.
+        """
+        clients = _CLIENT_CACHE.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+    async def get_balance(self, address: Optional[str] = None) -> int:
         """
         Get TRX balance of an address.
         :param address: Address to check (default: self.address)
-        :return: Balance in TRX (float)
+        :return: Balance in SUN (1 TRX = 1_000_000 SUN)
         """
         addr = address or self.address
         if not addr:
             raise ValueError("Address not provided")
-        # get_account_balance returns balance in SUN (integer)? No, tronpy usually returns Decimal or float.
-        # Actually standard tronpy returns Decimal. Let's return float.
-        balance = await self.client.get_account_balance(addr)
-        return float(balance)
+        cache = self._balance_cache
+        now = time.monotonic()
+        hit = cache.get(addr)
+        if hit is not None:
+            if hit[1] > now:
+                return hit[0]
+            del cache[addr]
+        # The node reports the balance in SUN; keep it as an exact int
+        account = await self.client.get_account(addr)
+        balance = account.get("balance", 0)
+        if self._balance_ttl > 0:
+            # Entries share one TTL, so the oldest is the first to expire:
+            # evict from the front until the stale ones are gone and there is room.
+            while cache:
+                oldest = next(iter(cache))
+                if cache[oldest][1] > now and len(cache) < _BALANCE_CACHE_SIZE:
+                    break
+                del cache[oldest]
+            cache[addr] = (balance, now + self._balance_ttl)
+        return balance
+
+    async def get_balance_trx(self, address: Optional[str] = None) -> Decimal:
+        """
+        Get TRX balance of an address in TRX, for display.
+        :param address: Address to check (default: self.address)
+        :return: Balance in TRX (Decimal, exact to the SUN)
+        """
+        return Decimal(await self.get_balance(address)) / 1_000_000
 
     async def get_trc20_balance(self, wallet_address: str, contract_address: str) -> int:
         """
@@ -59,25 +264,100 @@ class TronProvider:
         :param contract_address: Address of the TRC20 contract
         :return: Balance in smallest unit (raw integer)
         """
-        contract = await self.client.get_contract(contract_address)
-        # Assuming standard ERC20/TRC20 balanceOf method
-        balance = await contract.functions.balanceOf(wallet_address)
-        return int(balance)
+        # balanceOf(address) is fixed by the TRC20 standard, so the call is encoded
+        # locally instead of fetching the contract ABI from the node first.
+        result = await self.client.trigger_const_smart_contract_function(
+            _ZERO_ADDRESS, contract_address, "balanceOf(address)", _balance_of_parameter(wallet_address)
+        )
+        if not result:
+            # The node returns no data when contract_address has no contract code
+            raise ValueError(f"balanceOf returned no data; is {contract_address} a TRC20 contract?")
+        return int(result, 16)
+
+    async def get_trc20_balances(self, wallet_address: str, contract_addresses: List[str], max_concurrency: int = 8) -> List[int]:
+        """
+        Get balances of several TRC20 tokens concurrently.
+        :param wallet_address: Address holding the tokens
+        :param contract_addresses: Addresses of the TRC20 contracts
+        :param max_concurrency: Maximum number of balance calls in flight at once
+        :return: Raw integer balances, in the same order as contract_addresses
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def one(contract_address: str) -> int:
+            async with sem:
+                return await self.get_trc20_balance(wallet_address, contract_address)
+
+        return await asyncio.gather(*(one(c) for c in contract_addresses))
+
+    async def get_balances(self, address: Optional[str] = None, contract_addresses: List[str] = ()) -> dict:
+        """
+        Get TRX and TRC20 balances of an address, overlapping all RPCs.
+        :param address: Address to check (default: self.address)
+        :param contract_addresses: Addresses of TRC20 contracts to query
+        :return: Dict with "trx" (TRX balance in SUN) plus the raw integer balance keyed by each contract address
+        """
+        addr = address or self.address
+        if not addr:
+            raise ValueError("Address not provided")
+        trx, tokens = await asyncio.gather(
+            self.get_balance(addr),
+            self.get_trc20_balances(addr, contract_addresses),
+        )
+        balances = {"trx": trx}
+        balances.update(zip(contract_addresses, tokens))
+        return balances
 
-    async def send_transaction(self, to_address: str, amount: float) -> dict:
+    async def send_transaction(self, to_address: str, amount: int) -> dict:
         """
         Send TRX to an address.
         :param to_address: Recipient address
-        :param amount: Amount in TRX
+        :param amount: Amount in SUN (1 TRX = 1_000_000 SUN)
         :return: Transaction result dict
         """
+        return await self._send_transfer(to_address, amount, _MEMO, _FEE_LIMIT)
 
-        
+    async def send_transactions(
+        self, transfers: List[Tuple[str, int]], max_concurrency: int = 4
+    ) -> List[Union[dict, BaseException]]:
+        """
+        Send several TRX transfers concurrently (build, sign and broadcast overlap).
+        TRON has no account nonce, so transfers are independent and may land in any order.
+        Identical (to_address, amount) pairs built in the same millisecond can share a txid
+        and be rejected as duplicates.
+        A failed transfer does not stop the others: every transfer runs to completion and
+        its exception is returned in its slot, so callers must check each result before
+        retrying (only failed transfers should be resent).
+        :param transfers: (to_address, amount in SUN) pairs
+        :param max_concurrency: Maximum number of transfers in flight at once
+        :return: Transaction result dict or raised exception per transfer, in the same order as transfers
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def one(to_address: str, amount: int) -> dict:
+            async with sem:
+                return await self.send_transaction(to_address, amount)
+
+        return await asyncio.gather(*(one(to, amount) for to, amount in transfers), return_exceptions=True)
+
+    async def _send_transfer(self, to_address: str, amount: int, memo: bytes, fee_limit: int) -> dict:
+        """
+        Build, sign (via self.sign_transaction) and broadcast a TRX transfer.
+        :param to_address: Recipient address
+        :param amount: Amount in SUN
+        :param memo: Memo attached to the transaction
+        :param fee_limit: Fee limit in SUN
+        :return: Transaction result dict
+        """
         # build transaction
         txn = (
             self.client.trx.transfer(self.address, to_address, amount)
-            .memo("Powered by Agent Wallet")
-            .fee_limit(100_000_000)
+            .memo(memo)
+            .fee_limit(fee_limit)
         )
         # build is async in AsyncTron
         txn = await txn.build()
@@ -85,6 +365,9 @@ class TronProvider:
         signed_txn = await self.sign_transaction(txn)
         # broadcast
         result = await signed_txn.broadcast()
+        # Both balances are about to change; don't serve them from cache
+        self._balance_cache.pop(self.address, None)
+        self._balance_cache.pop(to_address, None)
         return result
 
     async def sign_transaction(self, transaction: Any) -> Any:
@@ -95,7 +378,18 @@ class TronProvider:
         """
         if not self._key:
             raise ValueError("Private key not provided for signing")
-        return transaction.sign(self._key)
+        # ECDSA signing is CPU-bound; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_SIGN_EXECUTOR, transaction.sign, self._key)
+
+    async def sign_transactions(self, transactions: List[Any]) -> List[Any]:
+        """
+        Sign several transactions concurrently.
+        Each signature runs in a worker thread, so a batch signs in parallel across cores.
+        :param transactions: Transaction objects (from tronpy)
+        :return: Signed transaction objects, in input order
+        """
+        return await asyncio.gather(*(self.sign_transaction(t) for t in transactions))
 
     async def broadcast_transaction(self, signed_transaction: Any) -> dict:
         """